@@ -1,6 +1,11 @@
 #!/usr/bin/env python3
 
 import argparse
+from array import array
+from bisect import bisect_left, bisect_right
+from functools import reduce
+from itertools import repeat
+from operator import mul, sub
 
 """
 Part 1:
@@ -34,21 +39,58 @@ def solve_part_2(values):
     if solution is not None:
       return value * solution[0] * solution[1]
 
+# An index of values for finding k values which sum to a target, where (as above) the same value can
+# be used multiple times
+# The distinct values are kept sorted, such that the search can be bounded with a binary search, and
+# in a hash set, such that the last value can be looked up rather than searched for. The index is
+# built once, and can then answer any number of queries.
+class KSumIndex:
+  def __init__(self, values):
+    self.values = array('q', sorted(set(values)))
+    self.present = frozenset(self.values)
+
+  # Returns a non-decreasing tuple of `k` values which sum to `target`, each at least as large as
+  # `self.values[start]`, or None if there are none
+  # The first value is chosen in ascending order, and is bounded from above as no value after it may
+  # be smaller, and from below as no value after it may be larger than the largest value. Pairs are
+  # found by looking up the complement of each candidate first value in the hash set, at C speed.
+  def find(self, target, k=2, start=0):
+    values = self.values
+    if k < 1 or start >= len(values): return None
+    if k == 1: return (target,) if target >= values[start] and target in self.present else None
+    first = bisect_left(values, target - (k - 1) * values[-1], start)
+    stop = bisect_right(values, target // k, start)
+    if k == 2:
+      complements = map(sub, repeat(target), values[first:stop])
+      complement = next(filter(self.present.__contains__, complements), None)
+      return None if complement is None else (target - complement, complement)
+    for i in range(first, stop):
+      rest = self.find(target - values[i], k - 1, i)
+      if rest is not None: return (values[i],) + rest
+    return None
+
+# Returns the product of `k` values in the index which sum to `target`, or None if there are none
+def solve_k_sum(index, k, target=2020):
+  solution = index.find(target, k)
+  if solution is not None:
+    return reduce(mul, solution)
+
 def main():
   # Parse arguments
   parser = argparse.ArgumentParser()
   parser.add_argument('input', help='a text file containing the Advent of Code problem input')
+  parser.add_argument('--target', type=int, default=2020, help='the sum to find values for')
   args = parser.parse_args()
 
-  # Read input into a set (fast lookup, duplicates are not a concern)
+  # Read input into a k-sum index (duplicates are not a concern)
   with open(args.input) as input_file:
-    values = set(int(value) for value in input_file.readlines())
+    index = KSumIndex(int(value) for value in input_file.readlines())
 
     # Solve problems
-    solution_to_part_1 = solve_part_1(values)
+    solution_to_part_1 = solve_k_sum(index, 2, args.target)
     print("Solution to part 1:", solution_to_part_1)
 
-    solution_to_part_2 = solve_part_2(values)
+    solution_to_part_2 = solve_k_sum(index, 3, args.target)
     print("Solution to part 2:", solution_to_part_2)
 
 if __name__ == '__main__':
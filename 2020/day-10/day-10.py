@@ -1,6 +1,7 @@
 #!/usr/bin/env python3
 
 import argparse
+from collections import deque
 
 """
 Part 1:
@@ -13,10 +14,28 @@ Count the number of possible joltage chains such that each link in each chain sp
 Assumption: well-formed input
 """
 
-# Sorts the input joltages, prepends 0 and appends the maximum joltage plus three
-def prepare_joltages(joltages):
-  joltages.sort()
-  return [0] + joltages + [joltages[-1] + 3]
+# Joltages are sorted by counting when their range is no more than this factor of their number
+DENSE_FACTOR = 4
+
+# Sorts the input joltages, prepends 0 and appends the maximum joltage plus the maximum gap
+def prepare_joltages(joltages, max_gap=3):
+  lowest, highest = min(joltages), max(joltages)
+  sorted_joltages = None
+  if highest - lowest < DENSE_FACTOR * len(joltages):
+    sorted_joltages = counting_sort(joltages, lowest, highest)
+  if sorted_joltages is None:
+    joltages.sort()
+    sorted_joltages = joltages
+  return [0] + sorted_joltages + [highest + max_gap]
+
+# Sorts distinct integers within the given bounds by scanning the whole range for the values
+# present, returning None if there are duplicates
+# Both building the set and scanning the range run at C speed, so this beats a comparison sort on
+# dense inputs.
+def counting_sort(values, lowest, highest):
+  present = set(values)
+  if len(present) != len(values): return None
+  return list(filter(present.__contains__, range(lowest, highest + 1)))
 
 # Returns the differences between each joltage (i.e. the length spanned by each link in the chain)
 def get_differences(prepared_joltages):
@@ -25,7 +44,8 @@ def get_differences(prepared_joltages):
 
 # Counts the number of alternative chains to the one that includes all joltages
 # This function is recursive, and is optimised with memoization
-def count_alternative_permutations(joltages, mem={}):
+def count_alternative_permutations(joltages, mem=None):
+  if mem is None: mem = {}
   current_joltage, remaining_joltages, permutations = joltages[0], joltages[1:], 0
   candidate_next_joltages = filter(lambda j : current_joltage + 3 >= j, remaining_joltages[:3])
   for i, joltage in enumerate(candidate_next_joltages):
@@ -34,19 +54,38 @@ def count_alternative_permutations(joltages, mem={}):
     permutations = permutations + mem[joltage] + (1 if i > 0 else 0)
   return permutations
 
+# Counts the number of chains through the sorted joltages from the first to the last, where each
+# link spans no more than `max_gap`, optionally modulo `modulus`
+# The number of chains ending at a joltage is the sum of those ending at each joltage within the gap
+# below it, so only a rolling window of those joltages and a running sum of their counts are kept.
+# As the joltages may be any sorted iterable, this runs in constant extra memory for a given gap.
+def count_chains(prepared_joltages, max_gap=3, modulus=None):
+  joltages = iter(prepared_joltages)
+  chains = 1 if modulus is None else 1 % modulus
+  window, window_sum = deque([(next(joltages), chains)]), chains
+  for joltage in joltages:
+    while window and window[0][0] < joltage - max_gap:
+      window_sum = window_sum - window.popleft()[1]
+    chains = window_sum if modulus is None else window_sum % modulus
+    window.append((joltage, chains))
+    window_sum = window_sum + chains
+  return chains
+
 def main():
   # Parse arguments
   parser = argparse.ArgumentParser()
   parser.add_argument('input', help='a text file containing the Advent of Code problem input')
+  parser.add_argument('--max-gap', type=int, default=3, help='the most a link in a chain may span')
+  parser.add_argument('--modulus', type=int, help='count the chains modulo this number')
   args = parser.parse_args()
 
   with open(args.input) as input_file:
-    joltages = prepare_joltages([int(value) for value in input_file.readlines()])
+    joltages = prepare_joltages([int(value) for value in input_file.readlines()], args.max_gap)
 
     # Solve problems
     differences = get_differences(joltages)
     print("Solution to part 1:", differences.count(1) * differences.count(3))
-    print("Solution to part 2:", 1 + count_alternative_permutations(joltages))
+    print("Solution to part 2:", count_chains(joltages, args.max_gap, args.modulus))
 
 if __name__ == '__main__':
   main()
\ No newline at end of file
@@ -1,6 +1,7 @@
 #!/usr/bin/env python3
 
 import argparse
+from array import array
 
 """
 Part 1:
@@ -45,7 +46,7 @@ def visible_seats(row, col, seating_plan):
   width, height = len(seating_plan[0]), len(seating_plan)
   inc_r, inc_c = range(row + 1, height), range(col + 1, width)
   dec_r, dec_c = range(row - 1, -1, -1), range(col - 1, -1, -1)
-  const_r, const_c = [row] * height, [col] * width
+  const_r, const_c = [row] * width, [col] * height
 
   directions = [
     zip(dec_r,   const_c), # North
@@ -81,8 +82,204 @@ def epoch(seating_plan, vacate_threshold, adjacency_function):
          for c, seat in enumerate(row)]
          for r, row  in enumerate(seating_plan)]
 
+# A seating plan encoded as two bitboards: arbitrary-precision integers in which each bit is a cell.
+# Rows are laid out with a stride of `width + 1`, so that every row is preceded by a padding column,
+# and the grid is surrounded by a padding row above and below. Padding cells are neither seats nor
+# floor, which stops neighbours from wrapping around between rows.
+class BitboardPlan:
+  def __init__(self, width, height, cells, seats, occupied):
+    self.width, self.height, self.stride = width, height, width + 1
+    self.cells, self.seats, self.occupied = cells, seats, occupied
+    self.directions = [-self.stride, -self.stride + 1, 1, self.stride + 1,
+                       self.stride, self.stride - 1, -1, -self.stride - 1]
+
+def encode_bitboards(seating_plan):
+  width, height = len(seating_plan[0]), len(seating_plan)
+  padding = '0' * (width + 1)
+  def encode(predicate):
+    rows = [''.join('1' if predicate(seat) else '0' for seat in reversed(row)) + '0'
+            for row in reversed(seating_plan)]
+    return int(padding + ''.join(rows) + padding, 2)
+  return BitboardPlan(width, height, encode(lambda seat: True), encode(lambda seat: seat != FLOOR),
+                      encode(lambda seat: seat == OCCUPIED))
+
+def decode_bitboards(plan):
+  size = (plan.height + 2) * plan.stride
+  seats = bin(plan.seats)[2:].zfill(size)[::-1]
+  occupied = bin(plan.occupied)[2:].zfill(size)[::-1]
+  return [[(OCCUPIED if occupied[p] == '1' else EMPTY) if seats[p] == '1' else FLOOR
+         for p in range((r + 1) * plan.stride + 1, (r + 2) * plan.stride)]
+         for r in range(plan.height)]
+
+# Shifts a bitboard such that each cell takes the value of the cell `offset` positions after it
+def shift(board, offset):
+  return board >> offset if offset > 0 else board << -offset
+
+# Returns eight bitboards, one per direction, of the cells whose adjacent seat is occupied
+def adjacent_occupied_bitboards(plan):
+  return [shift(plan.occupied, offset) & plan.seats for offset in plan.directions]
+
+# Returns eight bitboards, one per direction, of the cells whose first visible seat is occupied
+# Each ray is computed with an occluded (Kogge-Stone) fill: occupied seats are propagated backwards
+# through runs of floor, doubling the distance covered on every step.
+def visible_occupied_bitboards(plan):
+  floor, boards = plan.cells & ~plan.seats, []
+  for offset in plan.directions:
+    generate, propagate, distance = plan.occupied, floor, 1
+    while distance < max(plan.width, plan.height):
+      generate = generate | (propagate & shift(generate, offset * distance))
+      propagate = propagate & shift(propagate, offset * distance)
+      distance = distance * 2
+    boards.append(shift(generate, offset) & plan.seats)
+  return boards
+
+# Sums bitboards cell-wise, returning the bits of the sums from least to most significant
+def bitboard_sum(boards):
+  sums = [0] * max(1, len(boards).bit_length())
+  for carry in boards:
+    for i in range(len(sums)):
+      sums[i], carry = sums[i] ^ carry, sums[i] & carry
+  return sums
+
+# Returns a bitboard of the cells for which the bit-sliced sum is at least the given value
+def bitboard_at_least(sums, value, mask):
+  greater, equal = 0, mask
+  for i in reversed(range(len(sums))):
+    if (value >> i) & 1: equal = equal & sums[i]
+    else: greater, equal = greater | (equal & sums[i]), equal & ~sums[i]
+  return greater | equal
+
+# Advances the bitboard seating plan to its next state; the vectorized equivalent of `epoch`
+def epoch_bitboards(plan, vacate_threshold, occupied_bitboards_function):
+  sums = bitboard_sum(occupied_bitboards_function(plan))
+  none_occupied = plan.seats & ~bitboard_at_least(sums, 1, plan.seats)
+  vacate = bitboard_at_least(sums, vacate_threshold, plan.seats)
+  return BitboardPlan(plan.width, plan.height, plan.cells, plan.seats,
+                      none_occupied | (plan.occupied & ~vacate))
+
+OCCUPIED_BITBOARDS_FUNCTIONS = {
+  adjacent_seats: adjacent_occupied_bitboards,
+  visible_seats: visible_occupied_bitboards
+}
+
+# A compressed sparse row (CSR) table of each seat's neighbours. The neighbours of the seat at
+# `seats[i]` are the seat indices `indices[offsets[i]:offsets[i + 1]]`. Floor never changes, so an
+# index can be built once and reused across thresholds and runs on the same plan.
+class NeighbourIndex:
+  def __init__(self, seats, offsets, indices):
+    self.seats, self.offsets, self.indices = seats, offsets, indices
+
+# Builds the neighbour index of the given adjacency function in a single pass over the plan
+# Whichever the adjacency function, two seats are neighbours iff. they are consecutive seats along a
+# row, column or diagonal (and, for `adjacent_seats`, also touching). Scanning in row-major order
+# visits every such line in order, so it suffices to remember the last seat seen on each line.
+def build_neighbour_index(seating_plan, adjacency_function):
+  adjacent_only = adjacency_function == adjacent_seats
+  seats, neighbours = [], []
+  last_seats = [{}, {}, {}, {}] # Lines keyed by row, column, diagonal and anti-diagonal
+  for r, row in enumerate(seating_plan):
+    for c, seat in enumerate(row):
+      if seat == FLOOR: continue
+      i = len(seats)
+      seats.append((r, c))
+      neighbours.append([])
+      for lines, line in zip(last_seats, (r, c, r - c, r + c)):
+        if line in lines:
+          j = lines[line]
+          if not adjacent_only or (abs(seats[j][0] - r) <= 1 and abs(seats[j][1] - c) <= 1):
+            neighbours[i].append(j)
+            neighbours[j].append(i)
+        lines[line] = i
+
+  offsets, indices = array('I', [0]), array('I')
+  for seat_neighbours in neighbours:
+    indices.extend(seat_neighbours)
+    offsets.append(len(indices))
+  return NeighbourIndex(seats, offsets, indices)
+
+# Advances the occupancy of each seat in the index to its next state; the gather-based equivalent
+# of `epoch`, which needs no raycasting or bounds checks
+def epoch_indexed(occupied, neighbour_index, vacate_threshold):
+  offsets, indices, get = neighbour_index.offsets, neighbour_index.indices, occupied.__getitem__
+  next_occupied = bytearray(len(occupied))
+  for i in range(len(occupied)):
+    count = sum(map(get, indices[offsets[i]:offsets[i + 1]]))
+    next_occupied[i] = count < vacate_threshold if occupied[i] else count == 0
+  return next_occupied
+
+def index_occupancy(seating_plan, neighbour_index):
+  return bytearray(seating_plan[r][c] == OCCUPIED for r, c in neighbour_index.seats)
+
+def apply_occupancy(seating_plan, neighbour_index, occupied):
+  plan = [list(row) for row in seating_plan]
+  for (r, c), is_occupied in zip(neighbour_index.seats, occupied):
+    plan[r][c] = OCCUPIED if is_occupied else EMPTY
+  return plan
+
+# Advances the seating plan until it is in a stable state, re-evaluating only the seats whose
+# neighbourhood changed in the previous generation (the 'frontier')
+# Both adjacency and visibility are symmetric, so the seats affected by a change are exactly the
+# changed seat's own neighbours. Occupied neighbour counts are maintained as seats change, making
+# each re-evaluation constant time. The plan is stable once a generation changes no seats.
+def epoch_frontier_until_unchanged(seating_plan, vacate_threshold, neighbour_index):
+  offsets, indices = neighbour_index.offsets, neighbour_index.indices
+  neighbours = [indices[offsets[i]:offsets[i + 1]].tolist()
+                for i in range(len(neighbour_index.seats))]
+  occupied = index_occupancy(seating_plan, neighbour_index)
+  counts = [sum(occupied[n] for n in seat_neighbours) for seat_neighbours in neighbours]
+
+  frontier = range(len(neighbour_index.seats))
+  while True:
+    changed = [i for i in frontier
+               if (counts[i] >= vacate_threshold if occupied[i] else counts[i] == 0)]
+    if not changed:
+      break
+    frontier = set()
+    for i in changed:
+      occupied[i] = not occupied[i]
+      delta = 1 if occupied[i] else -1
+      for n in neighbours[i]:
+        counts[n] = counts[n] + delta
+      frontier.update(neighbours[i])
+      frontier.add(i)
+
+  return apply_occupancy(seating_plan, neighbour_index, occupied)
+
+LIST, VECTORIZED, INDEXED, INCREMENTAL = 'list', 'vectorized', 'indexed', 'incremental'
+
 # Advances the seating plan until it is in a stable, unchanging state
-def epoch_until_unchanged(seating_plan, vacate_threshold, adjacency_function):
+# The `engine` selects how generations are computed: LIST evaluates every seat with `epoch`,
+# VECTORIZED encodes the plan as bitboards so that each generation is a fixed number of whole-plan
+# integer operations, INDEXED gathers from a precomputed neighbour index, and INCREMENTAL uses the
+# same index but only re-evaluates the seats near the previous changes. The indexed engines accept
+# a prebuilt `neighbour_index`, which must have been built for the same adjacency function.
+def epoch_until_unchanged(seating_plan, vacate_threshold, adjacency_function, engine=LIST,
+                          neighbour_index=None):
+  if engine in (INDEXED, INCREMENTAL) and neighbour_index is None:
+    neighbour_index = build_neighbour_index(seating_plan, adjacency_function)
+
+  if engine == INCREMENTAL:
+    return epoch_frontier_until_unchanged(seating_plan, vacate_threshold, neighbour_index)
+
+  if engine == INDEXED:
+    occupied = index_occupancy(seating_plan, neighbour_index)
+    while True:
+      next_occupied = epoch_indexed(occupied, neighbour_index, vacate_threshold)
+      if occupied == next_occupied:
+        break
+      occupied = next_occupied
+    return apply_occupancy(seating_plan, neighbour_index, occupied)
+
+  if engine == VECTORIZED:
+    occupied_bitboards_function = OCCUPIED_BITBOARDS_FUNCTIONS[adjacency_function]
+    plan = encode_bitboards(seating_plan)
+    while True:
+      new_plan = epoch_bitboards(plan, vacate_threshold, occupied_bitboards_function)
+      if plan.occupied == new_plan.occupied:
+        break
+      plan = new_plan
+    return decode_bitboards(plan)
+
   while True:
     new_seating_plan = epoch(seating_plan, vacate_threshold, adjacency_function)
     if seating_plan == new_seating_plan:
@@ -97,13 +294,17 @@ def main():
   # Parse arguments
   parser = argparse.ArgumentParser()
   parser.add_argument('input', help='a text file containing the Advent of Code problem input')
+  parser.add_argument('--engine', choices=[LIST, VECTORIZED, INDEXED, INCREMENTAL], default=LIST,
+                      help='how generations of the seating plan are computed')
   args = parser.parse_args()
 
   seating_plan = parse_file(args.input)
 
-  stable_plan_1 = epoch_until_unchanged(seating_plan, VACATE_THRESHOLD_PART_1, adjacent_seats)
+  stable_plan_1 = epoch_until_unchanged(seating_plan, VACATE_THRESHOLD_PART_1, adjacent_seats,
+                                        args.engine)
   print("Solution to part 1:", count_occupied(stable_plan_1))
-  stable_plan_2 = epoch_until_unchanged(seating_plan, VACATE_THRESHOLD_PART_2, visible_seats)
+  stable_plan_2 = epoch_until_unchanged(seating_plan, VACATE_THRESHOLD_PART_2, visible_seats,
+                                        args.engine)
   print("Solution to part 2:", count_occupied(stable_plan_2))
 
 if __name__ == '__main__':
@@ -2,6 +2,10 @@
 
 import argparse
 import re
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from itertools import chain, repeat
+from operator import and_, floordiv, itemgetter, mul
 
 """
 Part 1:
@@ -31,9 +35,10 @@ Assumption: well-formed input
 
 NORTH, SOUTH, EAST, WEST, LEFT, RIGHT, FORWARD = 'N', 'S', 'E', 'W', 'L', 'R', 'F'
 COMPASS = [NORTH, EAST, SOUTH, WEST]
+ACTIONS = [NORTH, SOUTH, EAST, WEST, LEFT, RIGHT, FORWARD]
 
 def parse_file(input_file_name):
-  actions = ''.join([NORTH, SOUTH, EAST, WEST, LEFT, RIGHT, FORWARD])
+  actions = ''.join(ACTIONS)
   action_re = re.compile(r"^([" + actions + r"])(\d+)$")
   with open(input_file_name) as input_file:
     actions = [action_re.match(action).groups() for action in input_file]
@@ -49,6 +54,8 @@ def apply_actions(actions, ship, waypoint=None):
   for action in actions: apply_action(action, ship, waypoint)
 
 class NauticalObject:
+  __slots__ = ('x', 'y')
+
   def __init__(self, x, y):
     self.x, self.y = x, y
 
@@ -71,6 +78,8 @@ class NauticalObject:
       self.x, self.y = direction_sign * self.y, -direction_sign * self.x
 
 class Ship(NauticalObject):
+  __slots__ = ('r',)
+
   def __init__(self, x, y, r):
     super().__init__(x, y)
     self.r = r
@@ -80,16 +89,120 @@ class Ship(NauticalObject):
     self.r = COMPASS[(COMPASS.index(self.r) + int(angle * angle_sign / 90)) % len(COMPASS)]
 
 class Waypoint(NauticalObject):
-  pass
+  __slots__ = ()
+
+# Actions may also be compiled into parallel integer arrays, with one entry per action:
+#   turns:     the clockwise quarter turns of the action (modulo 4), or 0
+#   moves_x/y: the compass move of the action, or 0
+#   forward:   the value of the action if it moves forward, or 0
+# Headings are indices into COMPASS, such that turning clockwise increments the heading, and
+# rotations are looked up from tables of the cosine and sine of each clockwise quarter turn.
+COMPASS_X, COMPASS_Y = [0, 1, 0, -1], [1, 0, -1, 0]
+COS, SIN = [1, 0, -1, 0], [0, 1, 0, -1]
+
+# Per-action lookup tables, such that each array is computed from the actions' letters and values
+# with C-level maps rather than a Python loop over the actions
+TURN_SIGNS = {action: 1 if action == RIGHT else -1 if action == LEFT else 0 for action in ACTIONS}
+MOVES_X = {action: COMPASS_X[COMPASS.index(action)] if action in COMPASS else 0
+           for action in ACTIONS}
+MOVES_Y = {action: COMPASS_Y[COMPASS.index(action)] if action in COMPASS else 0
+           for action in ACTIONS}
+FORWARDS = {action: 1 if action == FORWARD else 0 for action in ACTIONS}
+
+class CompiledActions:
+  __slots__ = ('turns', 'moves_x', 'moves_y', 'forward')
+
+  def __init__(self, actions):
+    letters, values = list(map(itemgetter(0), actions)), list(map(itemgetter(1), actions))
+    signed_angles = map(mul, map(TURN_SIGNS.__getitem__, letters), values)
+    self.turns = array('b', map(and_, map(floordiv, signed_angles, repeat(90)), repeat(3)))
+    self.moves_x = array('q', map(mul, map(MOVES_X.__getitem__, letters), values))
+    self.moves_y = array('q', map(mul, map(MOVES_Y.__getitem__, letters), values))
+    self.forward = array('q', map(mul, map(FORWARDS.__getitem__, letters), values))
+
+  def __len__(self):
+    return len(self.turns)
+
+# Returns the final (x, y) of a ship after applying compiled actions, with the part 1 semantics if
+# no waypoint (x, y) is given and the part 2 semantics if it is
+# If a pair of arrays is given as the trajectory, the (x, y) after each action is appended to them.
+def run_compiled(compiled, x, y, heading, waypoint=None, trajectory=None):
+  steps = zip(compiled.turns, compiled.moves_x, compiled.moves_y, compiled.forward)
+  return run_steps(steps, x, y, heading, waypoint, trajectory)
+
+# As `run_compiled`, but for any iterable of (turn, move x, move y, forward) steps
+def run_steps(steps, x, y, heading, waypoint=None, trajectory=None):
+  record = trajectory is not None
+  if record: record_x, record_y = trajectory[0].append, trajectory[1].append
+  if waypoint is None:
+    for turn, move_x, move_y, forward in steps:
+      heading = (heading + turn) & 3
+      x = x + move_x + forward * COMPASS_X[heading]
+      y = y + move_y + forward * COMPASS_Y[heading]
+      if record: record_x(x), record_y(y)
+  else:
+    wp_x, wp_y = waypoint
+    for turn, move_x, move_y, forward in steps:
+      if turn:
+        cos, sin = COS[turn], SIN[turn]
+        wp_x, wp_y = cos * wp_x + sin * wp_y, cos * wp_y - sin * wp_x
+      wp_x, wp_y = wp_x + move_x, wp_y + move_y
+      x, y = x + forward * wp_x, y + forward * wp_y
+      if record: record_x(x), record_y(y)
+  return x, y
+
+# Returns arrays of the (x, y) of a ship after each compiled action, as `run_compiled`
+def trajectory(compiled, x, y, heading, waypoint=None):
+  positions = array('q'), array('q')
+  run_compiled(compiled, x, y, heading, waypoint, positions)
+  return positions
+
+# Returns the compiled (turn, move x, move y, forward) step of a single action, as `CompiledActions`
+def compile_action(action):
+  letter, value = action
+  turn = TURN_SIGNS[letter] * value // 90 & 3
+  return turn, MOVES_X[letter] * value, MOVES_Y[letter] * value, FORWARDS[letter] * value
+
+# Returns an array of the manhattan distance of each ship from its start after applying its own log
+# of actions, where every ship starts at the origin facing east, with the part 1 semantics if no
+# waypoint (x, y) is given and the part 2 semantics if it is
+# Logs are typically short and only run once, so rather than compiling each log into arrays, each
+# distinct action in the batch is compiled once and its step is looked up as the logs are run.
+def simulate_batch(logs, waypoint=None):
+  steps = {action: compile_action(action) for action in set(chain.from_iterable(logs))}
+  heading, distances = COMPASS.index(EAST), array('q')
+  for actions in logs:
+    x, y = run_steps(map(steps.__getitem__, actions), 0, 0, heading, waypoint)
+    distances.append(abs(x) + abs(y))
+  return distances
+
+# Equivalent to `simulate_batch`, but simulates chunks of the logs in a process pool
+def simulate_batch_parallel(logs, waypoint=None, workers=None, chunk_size=256):
+  chunks = [logs[i:i + chunk_size] for i in range(0, len(logs), chunk_size)]
+  distances = array('q')
+  with ProcessPoolExecutor(workers) as executor:
+    for chunk_distances in executor.map(simulate_batch, chunks, repeat(waypoint)):
+      distances.extend(chunk_distances)
+  return distances
 
 def main():
   # Parse arguments
   parser = argparse.ArgumentParser()
   parser.add_argument('input', help='a text file containing the Advent of Code problem input')
+  parser.add_argument('--compiled', action='store_true',
+    help='compile the actions into integer arrays before applying them')
   args = parser.parse_args()
 
   actions = parse_file(args.input)
 
+  if args.compiled:
+    compiled, heading = CompiledActions(actions), COMPASS.index(EAST)
+    x, y = run_compiled(compiled, 0, 0, heading)
+    print("Solution to part 1:", abs(x) + abs(y))
+    x, y = run_compiled(compiled, 0, 0, heading, (10, 1))
+    print("Solution to part 2:", abs(x) + abs(y))
+    return
+
   # Solve problems
   ship = Ship(0, 0, EAST)
   apply_actions(actions, ship)
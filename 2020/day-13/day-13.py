@@ -1,6 +1,7 @@
 #!/usr/bin/env python3
 
 import argparse
+from math import gcd
 
 """
 Part 1:
@@ -17,33 +18,31 @@ first convergence of the busses in the input.
 Assumption: well-formed input
 """
 
+# Returns the value along with its smallest multiple which is not below the target
 def exceed_target(value, target):
-  total = 0
-  while total < target: total = total + value
-  return value, total
+  return value, -(-target // value) * value
 
-# Determines whether the busses fulfill the requirements of convergence at the given time
-def have_converged(time, busses):
-  if time == 0: return False
-  for index, value in busses:
-    if (time + index) % value != 0: return False
-  return True
+# Combines the congruences `t = a1 (mod m1)` and `t = a2 (mod m2)` into a single congruence modulo
+# their lowest common multiple, returning None if no `t` satisfies both
+# The moduli need not be coprime: a solution exists iff. their gcd divides `a2 - a1`.
+def combine_congruences(a1, m1, a2, m2):
+  g = gcd(m1, m2)
+  if (a2 - a1) % g: return None
+  reduced_m2 = m2 // g
+  k = (a2 - a1) // g * pow(m1 // g % reduced_m2, -1, reduced_m2) % reduced_m2
+  return (a1 + m1 * k) % (m1 * reduced_m2), m1 * reduced_m2
 
-# Efficiently computes the time of the first convergence of all busses
-# The efficiency comes from the observation that, after the initial convergence, the time between
-# subsequent convergences is constant. This function exploits this fact to narrow the search area
+# Computes the time of the first convergence of all busses with the Chinese remainder theorem
+# Bus `id` at index `i` arrives at time `t + i` iff. `t = -i (mod id)`, so the congruences of all
+# busses are folded into one, whose smallest positive solution is the first convergence. Returns
+# None if the busses never converge.
 def first_convergence(busses):
-  time, increment = 0, busses[0][1]
-  for i in range(1, len(busses) + 1):
-    first_i_busses = busses[:i]
-    time = next_convergence(time, increment, first_i_busses)
-    increment = next_convergence(time + increment, increment, first_i_busses) - time
-  return time
-
-# Starting at the given time, incrementally checks subsequent times until a convergence is found
-def next_convergence(time, increment, busses):
-  while not have_converged(time, busses): time = time + increment
-  return time
+  time, period = 0, 1
+  for index, value in busses:
+    congruence = combine_congruences(time, period, -index % value, value)
+    if congruence is None: return None
+    time, period = congruence
+  return time if time > 0 else period
 
 def main():
   # Parse arguments
@@ -2,6 +2,9 @@
 
 import argparse
 import re
+from bisect import bisect_left
+from array import array
+from concurrent.futures import ProcessPoolExecutor
 
 """
 Part 1:
@@ -49,8 +52,7 @@ def apply_version_1_mask(mask, value):
 def apply_version_2_mask(mask, value):
   masked_value = value | int(mask.replace(X, UNSET), 2)
   value_string = format(masked_value, '036b')
-  floating_indices = [i for i, val in enumerate(mask) if val == X]
-  return ''.join([X if i in floating_indices else val for i, val in enumerate(value_string)])
+  return ''.join([X if bit == X else val for bit, val in zip(mask, value_string)])
 
 # Given a string value (potentially with floating bits), return all possible decoded values
 def expand_floating(value):
@@ -73,16 +75,135 @@ def run_program(program, decoder_version):
           mem[address] = operand[1]
   return mem
 
+# Compiles a mask into (and, or, floating) integer bitmasks, such that version 1 masks apply as
+# `(value & and_mask) | or_mask` and version 2 masks as `address | or_mask` with floating bits
+def compile_mask(mask):
+  or_mask = int(mask.replace(X, UNSET), 2)
+  floating_bits = int(mask.replace(SET, UNSET).replace(X, SET), 2)
+  return or_mask | floating_bits, or_mask, floating_bits
+
+# Returns the program with every mask compiled, so that no mask is parsed more than once
+def compile_program(program):
+  return [(MASK, compile_mask(instruction[1])) if instruction[0] == MASK else instruction
+          for instruction in program]
+
+# Memory is held in a dense array indexed by address when it is no larger than this many entries, or
+# than this factor of the number of addresses written, and in a sparse array otherwise
+DENSE_MEMORY_SIZE, DENSE_MEMORY_FACTOR = 1 << 16, 16
+
+# Runs a compiled program using decoder version 1, returning memory as (addresses, values) arrays of
+# unsigned 64-bit integers, with one entry per address written in ascending order of address
+# Version 1 only writes to the addresses in the program, so memory is bounded by the largest one.
+# Addresses are 36-bit though, so when they are sparse, values are instead stored by the rank of
+# their address among the addresses written, found by a binary search of the sorted addresses.
+def run_version_1(compiled_program):
+  addresses = array('Q', sorted({operand[0] for opcode, operand in compiled_program
+                                 if opcode == MEM}))
+  size = addresses[-1] + 1 if addresses else 0
+  dense = size <= max(DENSE_MEMORY_SIZE, DENSE_MEMORY_FACTOR * len(addresses))
+  mem = array('Q', bytes(8 * (size if dense else len(addresses))))
+  and_mask, or_mask, _ = compile_mask(X * 36)
+  for opcode, operand in compiled_program:
+    if opcode == MASK:
+      and_mask, or_mask, _ = operand
+    else:
+      slot = operand[0] if dense else bisect_left(addresses, operand[0])
+      mem[slot] = (operand[1] & and_mask) | or_mask
+  return addresses, array('Q', map(mem.__getitem__, addresses)) if dense else mem
+
+# Floating addresses are represented symbolically as (fixed bits, floating bits) patterns, where the
+# pattern matches every address equal to the fixed bits once the floating bits are cleared. A
+# pattern with `k` floating bits matches 2^k addresses.
+def pattern_size(pattern):
+  return 1 << bin(pattern[1]).count(SET)
+
+# Counts the addresses of the pattern which are not matched by any of the covering patterns
+# The pattern is split in two on a bit which floats in it but is fixed in a covering pattern, one
+# half of which no longer intersects that covering pattern. Covering patterns which do not intersect
+# a half are dropped before it is split further, and a half with no covering patterns left is
+# counted whole, so only the regions in which writes actually overlap are ever split.
+def count_uncovered(pattern, covering_patterns):
+  total, pending = 0, [(pattern, covering_patterns)]
+  while pending:
+    (fixed, floating), covering_patterns = pending.pop()
+    covering_patterns = [(c_fixed, c_floating) for c_fixed, c_floating in covering_patterns
+                         if not (fixed ^ c_fixed) & ~floating & ~c_floating]
+    if not covering_patterns:
+      total = total + pattern_size((fixed, floating))
+    elif all(floating & ~c_floating for _, c_floating in covering_patterns):
+      split_bits = floating & ~covering_patterns[0][1]
+      bit = split_bits & -split_bits
+      pending.append(((fixed, floating & ~bit), covering_patterns))
+      pending.append(((fixed | bit, floating & ~bit), covering_patterns))
+  return total
+
+# Computes the sum of memory after running a compiled program with decoder version 2, without
+# expanding any floating addresses
+# Writes are replayed in reverse, such that each write only contributes its value for the addresses
+# that no later write overwrites. These are counted from the patterns of the later writes, so the
+# cost depends on the number of (overlapping) writes rather than the number of addresses.
+# The address space is first sharded by prefix (see `shard_writes`), such that each write is only
+# checked against the later writes in the same shard rather than against every later write.
+def sum_memory_version_2(compiled_program, prefix_bits=8):
+  return sum(map(sum_writes, shard_writes(decode_writes(compiled_program), prefix_bits)))
+
+# Returns the (pattern, value) writes of a compiled program under decoder version 2
+def decode_writes(compiled_program):
+  writes, (_, set_bits, floating_bits) = [], compile_mask(X * 36)
+  for opcode, operand in compiled_program:
+    if opcode == MASK:
+      _, set_bits, floating_bits = operand
+    elif opcode == MEM:
+      address, value = operand
+      writes.append((((address | set_bits) & ~floating_bits, floating_bits), value))
+  return writes
+
+def sum_writes(writes):
+  total, later_patterns = 0, []
+  for pattern, value in reversed(writes):
+    total = total + value * count_uncovered(pattern, later_patterns)
+    later_patterns.append(pattern)
+  return total
+
+# Partitions the writes by the high-order `prefix_bits` bits of the address space, returning the
+# writes for each shard in program order
+# A write is only replayed in the shards its pattern can touch, with its pattern narrowed to the
+# shard by fixing the prefix bits. As shards are disjoint, their sums add up to the total.
+def shard_writes(writes, prefix_bits):
+  shift = 36 - prefix_bits
+  prefix_mask = ((1 << prefix_bits) - 1) << shift
+  shards = [[] for _ in range(1 << prefix_bits)]
+  for (fixed, floating), value in writes:
+    prefix_floating, narrowed_floating = floating & prefix_mask, floating & ~prefix_mask
+    prefix = prefix_floating
+    while True:
+      shard_fixed = fixed | prefix
+      shards[shard_fixed >> shift].append(((shard_fixed, narrowed_floating), value))
+      if prefix == 0: break
+      prefix = (prefix - 1) & prefix_floating
+  return shards
+
+# Equivalent to `sum_memory_version_2`, but sums the shards in a process pool
+def sum_memory_version_2_parallel(compiled_program, workers=None, prefix_bits=8):
+  shards = shard_writes(decode_writes(compiled_program), prefix_bits)
+  with ProcessPoolExecutor(workers) as executor:
+    return sum(executor.map(sum_writes, (shard for shard in shards if shard)))
+
 def main():
   # Parse arguments
   parser = argparse.ArgumentParser()
   parser.add_argument('input', help='a text file containing the Advent of Code problem input')
+  parser.add_argument('--workers', type=int,
+    help='solve part 2 in a pool of this many processes, sharded by address prefix')
   args = parser.parse_args()
 
-  program = parse_file(args.input)
+  program = compile_program(parse_file(args.input))
 
-  print("Solution to part 1:", sum(run_program(program, 1).values()))
-  print("Solution to part 2:", sum(run_program(program, 2).values()))
+  print("Solution to part 1:", sum(run_version_1(program)[1]))
+  if args.workers is None:
+    print("Solution to part 2:", sum_memory_version_2(program))
+  else:
+    print("Solution to part 2:", sum_memory_version_2_parallel(program, args.workers))
 
 if __name__ == '__main__':
   main()
\ No newline at end of file
@@ -1,6 +1,9 @@
 #!/usr/bin/env python3
 
 import argparse
+import os
+import struct
+from array import array
 
 """
 Part 1:
@@ -27,17 +30,110 @@ def play(starting_numbers, turns):
     current_number = next_number
   return current_number
 
+# The state of a game in progress: the turn most recently played, the number spoken on that turn,
+# the inverted index of numbers to the turn on which they were last spoken (0 if never spoken), and
+# the starting numbers of the game
+class GameState:
+  def __init__(self, turn, current_number, history, starting_numbers):
+    self.turn, self.current_number, self.history = turn, current_number, history
+    self.starting_numbers = list(starting_numbers)
+
+# Creates the state of a game once the starting numbers have been spoken
+# Rather than a dict, the inverted index is a preallocated array of unsigned 32-bit turn numbers.
+# Every number spoken is less than the turn count, so the array never needs to grow.
+def new_game(starting_numbers, turns):
+  history = array('I', bytes(4 * max(turns, max(starting_numbers) + 1)))
+  for i, number in enumerate(starting_numbers[:-1]):
+    history[number] = i + 1
+  return GameState(len(starting_numbers), starting_numbers[-1], history, starting_numbers)
+
+# A checkpoint is this header of (turn, current number, target turn count, number of starting
+# numbers, history size), followed by the starting numbers and the history
+CHECKPOINT_HEADER = struct.Struct('<QQQQQ')
+
+# Writes the game state, played towards the given turn count, to the given file, replacing any
+# previous checkpoint atomically
+def save_checkpoint(state, turns, checkpoint_file_name):
+  temp_file_name = checkpoint_file_name + '.tmp'
+  with open(temp_file_name, 'wb') as checkpoint_file:
+    header = CHECKPOINT_HEADER.pack(state.turn, state.current_number, turns,
+                                    len(state.starting_numbers), len(state.history))
+    checkpoint_file.write(header)
+    array('Q', state.starting_numbers).tofile(checkpoint_file)
+    state.history.tofile(checkpoint_file)
+  os.replace(temp_file_name, checkpoint_file_name)
+
+# Returns the game state and the target turn count stored in the given checkpoint file
+def load_checkpoint(checkpoint_file_name):
+  with open(checkpoint_file_name, 'rb') as checkpoint_file:
+    header = checkpoint_file.read(CHECKPOINT_HEADER.size)
+    turn, current_number, turns, starting_size, size = CHECKPOINT_HEADER.unpack(header)
+    starting_numbers, history = array('Q'), array('I')
+    starting_numbers.fromfile(checkpoint_file, starting_size)
+    history.fromfile(checkpoint_file, size)
+  return GameState(turn, current_number, history, starting_numbers), turns
+
+# Continues the game until the given turn, yielding (turn, number) pairs as they are spoken
+# If a checkpoint file is given, the game is resumed from it when it exists, and the state is
+# written to it every `checkpoint_interval` turns and once more when the generator finishes or is
+# closed. The history array is updated in place, so `state` stays usable after the generator ends.
+# A checkpoint is only resumed if it is of a game with the same starting numbers which has not yet
+# passed the given turn count, and is otherwise ignored (and overwritten). As the game is the same
+# whatever its target, a checkpoint made towards a different turn count is resumed, with its history
+# grown to fit the numbers which may now be spoken.
+def play_stream(state, turns, checkpoint_file_name=None, checkpoint_interval=10000000):
+  if checkpoint_file_name is not None and os.path.exists(checkpoint_file_name):
+    resumed, _ = load_checkpoint(checkpoint_file_name)
+    if resumed.starting_numbers == state.starting_numbers and resumed.turn <= turns:
+      if len(resumed.history) < turns:
+        resumed.history.frombytes(bytes(4 * (turns - len(resumed.history))))
+      state.turn, state.current_number, state.history = \
+        resumed.turn, resumed.current_number, resumed.history
+  history, current_number, turn = state.history, state.current_number, state.turn
+  if checkpoint_file_name is None: checkpoint_interval = turns
+  try:
+    while turn < turns:
+      for i in range(turn, min(turn + checkpoint_interval, turns)):
+        last_seen = history[current_number]
+        history[current_number] = i
+        current_number = i - last_seen if last_seen else 0
+        turn = i + 1
+        yield turn, current_number
+      if checkpoint_file_name is not None and turn < turns:
+        state.turn, state.current_number = turn, current_number
+        save_checkpoint(state, turns, checkpoint_file_name)
+  finally:
+    state.turn, state.current_number = turn, current_number
+    if checkpoint_file_name is not None: save_checkpoint(state, turns, checkpoint_file_name)
+
+# Equivalent to `play`, but backed by the compact array history rather than a dict
+# At 30000000 turns, this uses ~120MB rather than several GB of dict entries and boxed integers.
+def play_compact(starting_numbers, turns):
+  state = new_game(starting_numbers, turns)
+  history, current_number = state.history, state.current_number
+  for i in range(state.turn, turns):
+    last_seen = history[current_number]
+    history[current_number] = i
+    current_number = i - last_seen if last_seen else 0
+  return current_number
+
 def main():
   # Parse arguments
   parser = argparse.ArgumentParser()
   parser.add_argument('input', help='a text file containing the Advent of Code problem input')
+  parser.add_argument('--checkpoint', help='a file in which to checkpoint (and resume) part 2')
   args = parser.parse_args()
 
   with open(args.input) as input_file:
     numbers = [int(n) for n in input_file.readline().split(',')]
 
-    print("Solution to part 1:", play(numbers, 2020))
-    print("Solution to part 2:", play(numbers, 30000000))
+    print("Solution to part 1:", play_compact(numbers, 2020))
+    if args.checkpoint is None:
+      print("Solution to part 2:", play_compact(numbers, 30000000))
+    else:
+      state = new_game(numbers, 30000000)
+      for _ in play_stream(state, 30000000, args.checkpoint): pass
+      print("Solution to part 2:", state.current_number)
 
 if __name__ == '__main__':
   main()
\ No newline at end of file
@@ -1,7 +1,16 @@
 #!/usr/bin/env python3
 
 import argparse
+import os
 import re
+import sys
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from itertools import product, repeat
+from operator import itemgetter
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import rules
 
 """
 Part 1:
@@ -37,20 +46,127 @@ def count_valid_passwords(values, validation_function):
   valid_values = [(pol, pas) for pol, pas in values if validation_function(pol, pas)]
   return len(valid_values)
 
+# The policies as declarative rules over parsed (policy, password) records, compiled to validators
+POLICY_MIN, POLICY_MAX, POLICY_LETTER = rules.field(0, 0), rules.field(0, 1), rules.field(0, 2)
+PASSWORD = rules.field(1)
+
+validate_count_policy = rules.compile_rules(
+  rules.in_range(rules.count(PASSWORD, POLICY_LETTER), POLICY_MIN, POLICY_MAX))
+
+validate_index_policy = rules.compile_rules(rules.exactly_one(
+  rules.equals(rules.char_at(PASSWORD, POLICY_MIN), POLICY_LETTER),
+  rules.equals(rules.char_at(PASSWORD, POLICY_MAX), POLICY_LETTER)))
+
+def count_valid_records(values, validator):
+  return sum(map(validator, values))
+
+# Bulk mode: the whole buffer is parsed by a single `findall`, into columns of policy minimums,
+# maximums and letters (as byte values) and of passwords (as bytes), over which both policies are
+# evaluated in one pass without building a record per line
+bulk_policy_re = re.compile(rb'(\d+)-(\d+) ([a-z]): ([a-z]+)')
+
+class PolicyColumns:
+  def __init__(self, buffer):
+    matches = bulk_policy_re.findall(buffer)
+    self.minimums = array('I', map(int, map(itemgetter(0), matches)))
+    self.maximums = array('I', map(int, map(itemgetter(1), matches)))
+    self.letters = b''.join(map(itemgetter(2), matches))
+    self.passwords = list(map(itemgetter(3), matches))
+
+  # Returns the number of passwords valid under the (count, index) policies
+  def count_valid(self):
+    count_valid, index_valid = 0, 0
+    for minimum, maximum, letter, password in zip(self.minimums, self.maximums, self.letters,
+                                                  self.passwords):
+      count_valid = count_valid + (minimum <= password.count(letter) <= maximum)
+      index_valid = index_valid + ((password[minimum - 1] == letter) !=
+                                   (password[maximum - 1] == letter))
+    return count_valid, index_valid
+
+# Returns the byte offsets splitting the file into ranges of about `chunk_size` bytes, each ending
+# at the end of a line
+def chunk_boundaries(input_file_name, chunk_size):
+  boundaries = [0]
+  with open(input_file_name, 'rb') as input_file:
+    file_size = input_file.seek(0, os.SEEK_END)
+    while boundaries[-1] + chunk_size < file_size:
+      input_file.seek(boundaries[-1] + chunk_size)
+      input_file.readline()
+      boundaries.append(min(input_file.tell(), file_size))
+  if boundaries[-1] < file_size: boundaries.append(file_size)
+  return boundaries
+
+# Counts the passwords valid under the (count, index) policies in the given byte range of the file
+def count_valid_in_range(input_file_name, start, stop):
+  with open(input_file_name, 'rb') as input_file:
+    input_file.seek(start)
+    return PolicyColumns(input_file.read(stop - start)).count_valid()
+
+# Counts the passwords valid under the (count, index) policies, parsing byte ranges of the file in a
+# process pool
+# Workers open the file and read their own ranges, so the pool is only sent offsets and only returns
+# counts, and no range of the file is ever read by this process.
+def count_valid_parallel(input_file_name, workers=None, chunk_size=1 << 24):
+  boundaries = chunk_boundaries(input_file_name, chunk_size)
+  count_valid, index_valid = 0, 0
+  with ProcessPoolExecutor(workers) as executor:
+    ranges = executor.map(count_valid_in_range, repeat(input_file_name), boundaries, boundaries[1:])
+    for count, index in ranges:
+      count_valid, index_valid = count_valid + count, index_valid + index
+  return count_valid, index_valid
+
+# Checks the compiled policies and the bulk columns against the hand-written validators, over every
+# policy (including those where the minimum and maximum are equal) and password of up to 4 letters
+def test_policies():
+  values = []
+  for length in range(1, 4 + 1):
+    for password in map(''.join, product('ab', repeat=length)):
+      for minimum in range(1, length + 1):
+        for maximum in range(minimum, length + 1):
+          values.append(((minimum, maximum, 'a'), password))
+
+  for value in values:
+    assert validate_count_policy(value) == validate_with_count_policy(*value)
+    assert validate_index_policy(value) == validate_with_index_policy(*value)
+
+  buffer = ''.join(str(minimum) + '-' + str(maximum) + ' ' + letter + ': ' + password + '\n'
+                   for (minimum, maximum, letter), password in values).encode()
+  assert PolicyColumns(buffer).count_valid() == (
+    count_valid_passwords(values, validate_with_count_policy),
+    count_valid_passwords(values, validate_with_index_policy))
+
+  print("All tests passed.")
+
 def main():
   # Parse arguments
   parser = argparse.ArgumentParser()
   parser.add_argument('input', help='a text file containing the Advent of Code problem input')
+  parser.add_argument('--bulk', action='store_true',
+    help='parse the whole file at once into columns, and evaluate both policies over them')
+  parser.add_argument('--workers', type=int,
+    help='in bulk mode, parse ranges of the file in a pool of this many processes')
   args = parser.parse_args()
 
+  test_policies()
+
+  if args.bulk or args.workers is not None:
+    if args.workers is None:
+      with open(args.input, 'rb') as input_file:
+        solution_to_part_1, solution_to_part_2 = PolicyColumns(input_file.read()).count_valid()
+    else:
+      solution_to_part_1, solution_to_part_2 = count_valid_parallel(args.input, args.workers)
+    print("Solution to part 1:", solution_to_part_1)
+    print("Solution to part 2:", solution_to_part_2)
+    return
+
   with open(args.input) as input_file:
     values = [parse_line(policy_string.strip()) for policy_string in input_file.readlines()]
 
     # Solve problems
-    solution_to_part_1 = count_valid_passwords(values, validate_with_count_policy)
+    solution_to_part_1 = count_valid_records(values, validate_count_policy)
     print("Solution to part 1:", solution_to_part_1)
 
-    solution_to_part_2 = count_valid_passwords(values, validate_with_index_policy)
+    solution_to_part_2 = count_valid_records(values, validate_index_policy)
     print("Solution to part 2:", solution_to_part_2)
 
 
@@ -40,23 +40,75 @@ def count_trees(slope, step_col, step_row):
 def parse_row(row):
   return [False if obj == '.' else True for obj in row.strip()]
 
+# A slope may also be stored compactly as blocks of rows, each a flat byte string of cells without
+# line breaks, such that a regular pattern of cells can be sliced out of a block at once
+TREE = b'#'
+
+# Returns the width of the slope and a generator of its blocks, read lazily from a binary file
+# Rows are of a fixed width, and lines end with the same terminator ('\n' or '\r\n') as the first,
+# so each block is read as a whole number of lines.
+def read_blocks(input_file, block_rows=1 << 16):
+  first_row = input_file.readline()
+  width = len(first_row.rstrip(b'\r\n'))
+  line_length = width + len(first_row) - len(first_row.rstrip(b'\r\n'))
+  def blocks():
+    block = first_row + input_file.read((block_rows - 1) * line_length)
+    while block.strip():
+      yield block.replace(b'\r', b'').replace(b'\n', b'')
+      block = input_file.read(block_rows * line_length)
+  return width, blocks()
+
+# Counts the trees encountered for each of the (right, down) vectors in a single pass over the
+# blocks, which may be any iterable of blocks, such that tall slopes can be streamed from a file
+# As the slope repeats every `width` columns, the `k`th step of a vector lands in column
+# `(k * right) % width`, which only depends on `k % width`. The steps of each residue therefore
+# visit cells in the same column, `down * width` rows (`down * width * width` bytes) apart, and are
+# counted with a single strided slice of the block. Vectors equivalent modulo the width are only
+# counted once.
+def count_trees_multi(blocks, width, vectors):
+  queries = sorted({(right % width, down) for right, down in vectors})
+  counts = dict.fromkeys(queries, 0)
+  offset = 0
+  for block in blocks:
+    block_rows = len(block) // width
+    for right, down in queries:
+      first_step, stride = -(-offset // down), down * width * width
+      count = 0
+      for step in range(first_step, first_step + width):
+        row = step * down - offset
+        if row >= block_rows: break
+        count = count + block[row * width + step * right % width::stride].count(TREE)
+      counts[right, down] = counts[right, down] + count
+    offset = offset + block_rows
+  return [counts[right % width, down] for right, down in vectors]
+
 def main():
   # Parse arguments
   parser = argparse.ArgumentParser()
   parser.add_argument('input', help='a text file containing the Advent of Code problem input')
+  parser.add_argument('--slope', action='append', default=[], metavar='RIGHT,DOWN',
+    help='also count the trees encountered with the given vector (may be repeated)')
   args = parser.parse_args()
 
-  with open(args.input) as input_file:
-    slope = [parse_row(row) for row in input_file.readlines()]
+  part_1_vector = (3, 1)
+  part_2_vectors = [(1, 1), (3, 1), (5, 1), (7, 1), (1, 2)]
+  slope_vectors = [tuple(int(step) for step in slope.split(',')) for slope in args.slope]
+
+  # Count the trees for every vector in a single pass over the rows, streamed from the file
+  with open(args.input, 'rb') as input_file:
+    width, blocks = read_blocks(input_file)
+    counts = count_trees_multi(blocks, width, [part_1_vector] + part_2_vectors + slope_vectors)
 
     # Solve problems
-    solution_to_part_1 = count_trees(slope, 3, 1)
+    solution_to_part_1 = counts[0]
     print("Solution to part 1:", solution_to_part_1)
 
-    part_2_vectors = [(1, 1), (3, 1), (5, 1), (7, 1), (1, 2)]
-    part_2_counts = [count_trees(slope, vector[0], vector[1]) for vector in part_2_vectors]
+    part_2_counts = counts[1:1 + len(part_2_vectors)]
     solution_to_part_2 = reduce(mul, part_2_counts, 1)
     print("Solution to part 2:", solution_to_part_2)
 
+    for vector, count in zip(slope_vectors, counts[1 + len(part_2_vectors):]):
+      print("Trees encountered with vector " + str(vector) + ":", count)
+
 if __name__ == '__main__':
-  main()
\ No newline at end of file
+  main()
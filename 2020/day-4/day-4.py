@@ -1,7 +1,14 @@
 #!/usr/bin/env python3
 
 import argparse
+import os
 import re
+import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import rules
 
 """
 Part 1:
@@ -44,6 +51,11 @@ MIN_EXPIRATION_YEAR, MAX_EXPIRATION_YEAR = 2020, 2030
 MIN_HEIGHT_CM, MAX_HEIGHT_CM = 150, 193
 MIN_HEIGHT_IN, MAX_HEIGHT_IN = 59, 76
 
+YEAR_RE        = re.compile(r"^\d{4}$")
+HEIGHT_RE      = re.compile(r"^(\d{2,3})(cm|in)$")
+HAIR_COLOUR_RE = re.compile(r"^#[0-9a-f]{6}$")
+PASSPORT_ID_RE = re.compile(r"^\d{9}$")
+
 def are_required_fields_present(passport):
   for field in REQUIRED_PASSPORT_FIELDS:
     if field not in passport: return False
@@ -61,7 +73,7 @@ def is_passport_valid(passport):
   return True
 
 def is_year_valid(year, minimum, maximum):
-  is_four_digits = re.match(r"^\d{4}$", year)
+  is_four_digits = YEAR_RE.match(year)
   if not is_four_digits: return False
   return minimum <= int(year) <= maximum
 
@@ -75,42 +87,179 @@ def is_expiration_year_valid(eyr):
   return is_year_valid(eyr, MIN_EXPIRATION_YEAR, MAX_EXPIRATION_YEAR)
 
 def is_height_valid(hgt):
-  is_valid_format = re.match(r"^(\d{2,3})(cm|in)$", hgt)
+  is_valid_format = HEIGHT_RE.match(hgt)
   if not is_valid_format: return False
   height, unit = is_valid_format.group(1, 2)
   if unit == "cm": return MIN_HEIGHT_CM <= int(height) <= MAX_HEIGHT_CM
   else: return MIN_HEIGHT_IN <= int(height) <= MAX_HEIGHT_IN
 
 def is_hair_colour_valid(hcl):
-  return re.match(r"^#[0-9a-f]{6}$", hcl)
+  return HAIR_COLOUR_RE.match(hcl)
 
 def is_eye_colour_valid(ecl):
   return ecl in VALID_EYE_COLOURS
 
 def is_passport_id_valid(pid):
-  return re.match(r"^\d{9}$", pid)
+  return PASSPORT_ID_RE.match(pid)
+
+# The validation rules above, as declarative rulesets compiled to validators
+def year_rule(key, minimum, maximum):
+  year = rules.field(key)
+  return rules.all_of(rules.matches(year, YEAR_RE),
+                      rules.in_range(rules.as_int(year), minimum, maximum))
+
+def height_rule(unit, minimum, maximum):
+  height = rules.field('hgt')
+  return rules.all_of(rules.matches(height, r"^\d{2,3}" + unit + "$"),
+                      rules.in_range(rules.as_int(rules.slice_of(height, None, -len(unit))),
+                                     minimum, maximum))
+
+REQUIRED_FIELDS_RULES = rules.all_of(*[rules.present(key) for key in REQUIRED_PASSPORT_FIELDS])
+
+PASSPORT_RULES = rules.all_of(
+  REQUIRED_FIELDS_RULES,
+  year_rule('byr', MIN_BIRTH_YEAR, MAX_BIRTH_YEAR),
+  year_rule('iyr', MIN_ISSUE_YEAR, MAX_ISSUE_YEAR),
+  year_rule('eyr', MIN_EXPIRATION_YEAR, MAX_EXPIRATION_YEAR),
+  rules.any_of(height_rule("cm", MIN_HEIGHT_CM, MAX_HEIGHT_CM),
+               height_rule("in", MIN_HEIGHT_IN, MAX_HEIGHT_IN)),
+  rules.matches(rules.field('hcl'), HAIR_COLOUR_RE),
+  rules.one_of(rules.field('ecl'), VALID_EYE_COLOURS),
+  rules.matches(rules.field('pid'), PASSPORT_ID_RE))
+
+validate_required_fields = rules.compile_rules(REQUIRED_FIELDS_RULES)
+validate_passport = rules.compile_rules(PASSPORT_RULES)
 
 def count_valid_passwords(passports, validation_function):
-  valid_passports = [passport for passport in passports if validation_function(passport)]
-  return len(valid_passports)
+  return sum(1 for passport in passports if validation_function(passport))
+
+# Counts the passports valid for parts 1 and 2 respectively, in a single pass
+def count_valid_passports(passports):
+  present_count, valid_count = 0, 0
+  for passport in passports:
+    if validate_required_fields(passport):
+      present_count = present_count + 1
+      if validate_passport(passport): valid_count = valid_count + 1
+  return present_count, valid_count
+
+# Lazily yields the passports in the given lines, where passports are separated by blank lines
+def parse_passports(lines):
+  current_passport = {}
+  for line in lines:
+    fields = line.split()
+    if fields:
+      for field in fields:
+        key, value = field.split(":")
+        current_passport[key] = value
+    elif current_passport:
+      yield current_passport
+      current_passport = {}
+  # If input doesn't end with a newline, handle this
+  if current_passport:
+    yield current_passport
 
 def parse_file(input_file_name):
-  passports = []
   with open(input_file_name) as input_file:
-    current_passport = {}
-    for line in input_file:
-      stripped_line = line.strip()
-      if stripped_line != "":
-        for line_split in stripped_line.split():
-          entry = line_split.split(":")
-          current_passport[entry[0]] = entry[1]
-      else:
-        passports.append(current_passport)
-        current_passport = {}
-    # If input doesn't end with a newline, handle this
-    if current_passport != {}:
-      passports.append(current_passport)
-  return passports
+    return list(parse_passports(input_file))
+
+# Lazily yields chunks of roughly `chunk_size` characters from the file, each ending on a blank line
+# such that no passport is split across chunks
+def read_chunks(input_file, chunk_size):
+  remainder = ""
+  while True:
+    block = input_file.read(chunk_size)
+    if not block:
+      if remainder: yield remainder
+      return
+    buffer = remainder + block
+    boundary = last_blank_line_end(buffer)
+    remainder = buffer[boundary:]
+    if boundary: yield buffer[:boundary]
+
+# Returns the index just after the last complete blank line in the buffer, or 0 if there is none,
+# where (as in `parse_passports`) a line is blank if it only contains whitespace
+# Lines are checked from the end of the buffer, so typically only the last passport is scanned.
+def last_blank_line_end(buffer):
+  line_end = buffer.rfind("\n")
+  while line_end != -1:
+    line_start = buffer.rfind("\n", 0, line_end)
+    if not buffer[line_start + 1:line_end].strip(): return line_end + 1
+    line_end = line_start
+  return 0
+
+def count_valid_passports_in_chunk(chunk):
+  return count_valid_passports(parse_passports(chunk.splitlines()))
+
+# Counts the passports valid for parts 1 and 2, validating chunks of the file in a process pool
+# At most two chunks per worker are in flight at once, so memory stays bounded by the chunk size.
+def count_valid_passports_parallel(input_file_name, workers=None, chunk_size=1 << 22):
+  workers = workers or os.cpu_count()
+  present_count, valid_count, in_flight = 0, 0, deque()
+  with ProcessPoolExecutor(workers) as executor, open(input_file_name) as input_file:
+    for chunk in read_chunks(input_file, chunk_size):
+      in_flight.append(executor.submit(count_valid_passports_in_chunk, chunk))
+      while len(in_flight) >= 2 * workers:
+        present, valid = in_flight.popleft().result()
+        present_count, valid_count = present_count + present, valid_count + valid
+    for future in in_flight:
+      present, valid = future.result()
+      present_count, valid_count = present_count + present, valid_count + valid
+  return present_count, valid_count
+
+# The set of strings which validate as years within the given range
+def valid_year_strings(minimum, maximum):
+  return frozenset(str(year) for year in range(minimum, maximum + 1) if len(str(year)) == 4)
+
+# The set of strings which validate as heights, including the zero-padded three digit heights in
+# inches which the height format permits
+VALID_HEIGHTS = frozenset(
+  [str(height) + "cm" for height in range(MIN_HEIGHT_CM, MAX_HEIGHT_CM + 1)] +
+  [format(height, padding) + "in" for height in range(MIN_HEIGHT_IN, MAX_HEIGHT_IN + 1)
+                                  for padding in ('d', '03d')])
+
+# Field rules evaluated over whole columns: each predicate is a C-level callable, so that a rule is
+# applied to a column with `map` rather than with a Python function call per passport
+COLUMN_RULES = [
+  ('byr', valid_year_strings(MIN_BIRTH_YEAR, MAX_BIRTH_YEAR).__contains__),
+  ('iyr', valid_year_strings(MIN_ISSUE_YEAR, MAX_ISSUE_YEAR).__contains__),
+  ('eyr', valid_year_strings(MIN_EXPIRATION_YEAR, MAX_EXPIRATION_YEAR).__contains__),
+  ('hgt', VALID_HEIGHTS.__contains__),
+  ('hcl', HAIR_COLOUR_RE.match),
+  ('ecl', frozenset(VALID_EYE_COLOURS).__contains__),
+  ('pid', PASSPORT_ID_RE.match)
+]
+
+# A columnar store of passports, with one column of values per required field, where a missing
+# field is stored as an empty string
+class PassportColumns:
+  def __init__(self, passports):
+    self.columns = {field: [] for field in REQUIRED_PASSPORT_FIELDS}
+    self.size = 0
+    for passport in passports:
+      for field, column in self.columns.items():
+        column.append(passport.get(field, ""))
+      self.size = self.size + 1
+
+# Converts a column of truthy values to an integer bitmap with a one byte flag per passport, such
+# that bitmaps can be combined with bitwise operators and counted with a popcount
+def to_bitmap(values):
+  return int.from_bytes(bytes(map(bool, values)), 'little')
+
+def popcount(bitmap):
+  return bin(bitmap).count("1")
+
+# Validates passport columns, returning the counts of passports valid for parts 1 and 2 along with
+# the count of passports which are missing, or have an invalid value for, each field
+def validate_columns(passports):
+  all_present = all_valid = to_bitmap([True] * passports.size)
+  missing_counts, invalid_counts = {}, {}
+  for field, predicate in COLUMN_RULES:
+    column = passports.columns[field]
+    present, valid = to_bitmap(column), to_bitmap(map(predicate, column))
+    missing_counts[field] = passports.size - popcount(present)
+    invalid_counts[field] = popcount(present & ~valid)
+    all_present, all_valid = all_present & present, all_valid & valid
+  return popcount(all_present), popcount(all_valid), missing_counts, invalid_counts
 
 def test_validation():
   invalid_years = ["abcd", "-1234", "50000", "?!@£", "202020", "0", "560_"]
@@ -171,21 +320,60 @@ def test_validation():
   assert not is_passport_id_valid("0123456789")
   assert not is_passport_id_valid("abcdefghi")
 
+  # Column rules agree with the field validators
+  field_validators = {
+    'byr': is_birth_year_valid, 'iyr': is_issue_year_valid, 'eyr': is_expiration_year_valid,
+    'hgt': is_height_valid, 'hcl': is_hair_colour_valid, 'ecl': is_eye_colour_valid,
+    'pid': is_passport_id_valid
+  }
+  values = invalid_years + VALID_EYE_COLOURS + [str(value) for value in range(0, 2100)] + \
+    [str(height) + unit for height in range(0, 200) for unit in ["cm", "in"]] + \
+    ["059in", "076in", "0150cm", "#123abc", "#123abz", "000000001", "0123456789"]
+  for key, predicate in COLUMN_RULES:
+    for value in values:
+      assert bool(predicate(value)) == bool(field_validators[key](value))
+
+  # Compiled rulesets agree with the hand-written validators
+  valid_passport = {'byr': "1980", 'iyr': "2012", 'eyr': "2030", 'hgt': "74in", 'hcl': "#623a2f",
+                    'ecl': "grn", 'pid': "087499704"}
+  assert validate_passport(valid_passport) and validate_required_fields(valid_passport)
+  for key in REQUIRED_PASSPORT_FIELDS:
+    for value in values + [None]:
+      passport = dict(valid_passport)
+      if value is None: del passport[key]
+      else: passport[key] = value
+      assert validate_required_fields(passport) == are_required_fields_present(passport)
+      assert validate_passport(passport) == is_passport_valid(passport)
+
   print("All tests passed.")
 
 def main():
   # Parse arguments
   parser = argparse.ArgumentParser()
   parser.add_argument('input', help='a text file containing the Advent of Code problem input')
+  mode = parser.add_mutually_exclusive_group()
+  mode.add_argument('--workers', type=int,
+    help='validate chunks of the input in a pool of this many processes')
+  mode.add_argument('--report', action='store_true',
+    help='validate the input as columns and report the failure count of each field rule')
   args = parser.parse_args()
 
-  passports = parse_file(args.input)
-
   test_validation()
 
-  # Solve problems
-  print("Solution to part 1:", count_valid_passwords(passports, are_required_fields_present))
-  print("Solution to part 2:", count_valid_passwords(passports, is_passport_valid))
+  # Solve problems, streaming passports from the input rather than holding them all in memory
+  if args.report:
+    with open(args.input) as input_file:
+      passports = PassportColumns(parse_passports(input_file))
+    present_count, valid_count, missing_counts, invalid_counts = validate_columns(passports)
+    for field, _ in COLUMN_RULES:
+      print(field + ":", missing_counts[field], "missing,", invalid_counts[field], "invalid")
+  elif args.workers is None:
+    with open(args.input) as input_file:
+      present_count, valid_count = count_valid_passports(parse_passports(input_file))
+  else:
+    present_count, valid_count = count_valid_passports_parallel(args.input, args.workers)
+  print("Solution to part 1:", present_count)
+  print("Solution to part 2:", valid_count)
 
 if __name__ == '__main__':
   main()
\ No newline at end of file
@@ -1,6 +1,8 @@
 #!/usr/bin/env python3
 
 import argparse
+from functools import partial
+from operator import add, mul
 
 """
 Part 1:
@@ -22,14 +24,62 @@ Find the only id s.t. both (id-1) amd (id+1) are valid ids in the input
 Assumption: well-formed input
 """
 
+# As the id is row * 8 + column, and the column is encoded in the last 3 bits, the whole code is the
+# id in binary, with 'F' and 'L' as 0 and 'B' and 'R' as 1
+SEAT_BITS = str.maketrans('FBLR', '0101')
+SEAT_BYTES = bytes.maketrans(b'FBLR', b'0101')
+parse_binary = partial(int, base=2)
+
 # Returns the unique id encoded by the input
 def decode(code):
-  row = binary_string_to_int(code[:7], 'F', 'B')
-  col = binary_string_to_int(code[7:], 'L', 'R')
-  return row * 8 + col
+  return parse_binary(code.translate(SEAT_BITS))
+
+# Returns the ids encoded by a buffer of whitespace-separated codes, translating them all at once
+def decode_buffer(buffer):
+  return list(map(parse_binary, buffer.translate(SEAT_BYTES).split()))
+
+# Generates the ids encoded in a binary file, a chunk of the file at a time
+def read_id_chunks(input_file, chunk_size=1 << 20):
+  remainder = b''
+  while True:
+    block = input_file.read(chunk_size)
+    if not block:
+      yield decode_buffer(remainder)
+      return
+    buffer = remainder + block
+    boundary = buffer.rfind(b'\n') + 1
+    remainder = buffer[boundary:]
+    yield decode_buffer(buffer[:boundary])
+
+# Returns the (lowest, highest, count, sum, sum of squares) of the ids in chunks of ids, or None if
+# there are no ids
+def summarise_ids(id_chunks):
+  summary = None
+  for ids in id_chunks:
+    if not ids: continue
+    chunk_summary = min(ids), max(ids), len(ids), sum(ids), sum(map(mul, ids, ids))
+    if summary is not None:
+      chunk_summary = (min(chunk_summary[0], summary[0]), max(chunk_summary[1], summary[1]),
+                       *map(add, chunk_summary[2:], summary[2:]))
+    summary = chunk_summary
+  return summary
 
-def binary_string_to_int(code, low_letter, high_letter):
-  return int(code.replace(low_letter, '0').replace(high_letter, '1'), 2)
+# Returns the only id missing between the lowest and highest ids, given their summary, or None if
+# there is not exactly one id missing
+# The ids between the lowest and highest sum to an arithmetic series, less the missing id. That
+# alone would report a gap for any ids, so the count must also be one short of the series, and the
+# sum of squares short by exactly the square of the missing id.
+def find_missing_id(summary):
+  lowest, highest, count, total, total_of_squares = summary
+  if count != highest - lowest: return None
+  missing_id = (lowest + highest) * (highest - lowest + 1) // 2 - total
+  series_of_squares = sum_of_squares(highest) - sum_of_squares(lowest - 1)
+  if series_of_squares - total_of_squares != missing_id * missing_id: return None
+  return missing_id
+
+# Returns the sum of the squares 0^2 + 1^2 + ... + n^2
+def sum_of_squares(n):
+  return n * (n + 1) * (2 * n + 1) // 6
 
 def main():
   # Parse arguments
@@ -37,17 +87,17 @@ def main():
   parser.add_argument('input', help='a text file containing the Advent of Code problem input')
   args = parser.parse_args()
 
-  with open(args.input) as input_file:
-    codes = [row.strip() for row in input_file.readlines()]
-
-    ids = [decode(code) for code in codes]
-
-    # Solve problems
-    print("Solution to part 1:", max(ids))
+  # Decode the codes as they stream from the file, keeping only a summary of the ids
+  with open(args.input, 'rb') as input_file:
+    summary = summarise_ids(read_id_chunks(input_file))
 
-    ids.sort()
-    for i in range(len(ids) - 1):
-      if ids[i + 1] - ids[i] != 1: print("Solution to part 2:", ids[i] + 1)
+  # Solve problems
+  print("Solution to part 1:", summary[1])
+  missing_id = find_missing_id(summary)
+  if missing_id is None:
+    print("Solution to part 2: no single id is missing between", summary[0], "and", summary[1])
+  else:
+    print("Solution to part 2:", missing_id)
 
 if __name__ == '__main__':
   main()
\ No newline at end of file
@@ -1,6 +1,7 @@
 #!/usr/bin/env python3
 
 import argparse
+from string import ascii_lowercase
 
 """
 Part 1:
@@ -31,17 +32,52 @@ def parse_file(input_file_name):
 def count_answers(groups, set_function):
   return sum([len(set_function(*map(set, group))) for group in groups])
 
+# Answers may also be encoded as 26-bit masks, where bit `i` is set iff. the `i`th letter is present
+LETTER_BITS = {letter: 1 << i for i, letter in enumerate(ascii_lowercase)}
+ALL_LETTERS = (1 << len(ascii_lowercase)) - 1
+
+# The bits of the distinct letters are summed, as that is faster than OR-ing the bits of every letter
+def to_mask(answers):
+  return sum(map(LETTER_BITS.__getitem__, set(answers)))
+
+def popcount(mask):
+  return bin(mask).count("1")
+
+# Generates the (union, intersection) masks of each group, folding lines into the masks as they are
+# read, such that no group is ever held in memory
+def read_group_masks(lines):
+  union, intersection, in_group = 0, ALL_LETTERS, False
+  for line in lines:
+    stripped_line = line.strip()
+    if stripped_line:
+      mask = to_mask(stripped_line)
+      union, intersection, in_group = union | mask, intersection & mask, True
+    elif in_group:
+      yield union, intersection
+      union, intersection, in_group = 0, ALL_LETTERS, False
+  # If input doesn't end with a blank line, handle the last group
+  if in_group: yield union, intersection
+
+# Returns the sums of the number of letters in the (union, intersection) of each group
+def count_answers_from_masks(group_masks):
+  union_count = intersection_count = 0
+  for union, intersection in group_masks:
+    union_count = union_count + popcount(union)
+    intersection_count = intersection_count + popcount(intersection)
+  return union_count, intersection_count
+
 def main():
   # Parse arguments
   parser = argparse.ArgumentParser()
   parser.add_argument('input', help='a text file containing the Advent of Code problem input')
   args = parser.parse_args()
 
-  groups = parse_file(args.input)
+  with open(args.input) as input_file:
+    union_count, intersection_count = count_answers_from_masks(read_group_masks(input_file))
 
   # Solve problems
-  print("Solution to part 1:", count_answers(groups, set.union))
-  print("Solution to part 2:", count_answers(groups, set.intersection))
+  print("Solution to part 1:", union_count)
+  print("Solution to part 2:", intersection_count)
 
 if __name__ == '__main__':
   main()
\ No newline at end of file
@@ -33,21 +33,107 @@ def parse_file(input_file_name):
       bags[key] = children
   return bags
 
-# Finds the unique outer-most bags which can contain the input bag name
-def get_top_level_bags(bags, bag_name):
-  parent_bags = set(find_bags_which_contain(bags, bag_name).keys())
-  top_level_bags = set()
-  for bag in parent_bags:
-    top_level_bags |= get_top_level_bags(bags, bag)
-  return parent_bags.union(top_level_bags)
-
-# Returns a dictionary with all bags which contain the input bag name
-def find_bags_which_contain(bags, bag_name):
-  return {bag: contents for bag, contents in bags.items() if bag_name in [c[1] for c in contents]}
-
-# Counts the total number of (sub-)bags contained within the given bag
-def count_contents(bags, bag):
-  return sum([c[0] + c[0] * count_contents(bags, c[1]) for c in bags[bag]])
+# An index of the bag rules in which bag names are interned to integer IDs
+# Both the forward (contents) and reverse (parents) edges are indexed. Contents are counted with a
+# traversal memoized per bag, so shared sub-graphs are only traversed once across all queries.
+# Memoizing the ancestors of every intermediate bag would take quadratic memory on deep rule sets,
+# so ancestors are found with a traversal of the reverse edges and memoized per queried bag.
+# The rules dictionary is kept in sync as rules are changed through `set_rule` and `remove_rule`.
+class BagGraph:
+  def __init__(self, bags):
+    self.bags, self.ids, self.names, self.contents, self.parents = bags, {}, [], [], []
+    self.counts, self.ancestors = {}, {}
+    for bag, contents in bags.items():
+      bag_id = self.intern(bag)
+      self.contents[bag_id] = [(count, self.intern(child)) for count, child in contents]
+      for _, child_id in self.contents[bag_id]:
+        self.parents[child_id].add(bag_id)
+
+  def intern(self, bag_name):
+    if bag_name not in self.ids:
+      self.ids[bag_name] = len(self.names)
+      self.names.append(bag_name)
+      self.contents.append([])
+      self.parents.append(set())
+    return self.ids[bag_name]
+
+  # Adds the rule for the given bag, or replaces its existing rule
+  # Only the cached results which depend on the rule are invalidated: the counts of the bag and of
+  # every bag which can contain it (found along the reverse edges), and the ancestors of any queried
+  # bag which is, or is contained by, a bag whose parents changed.
+  def set_rule(self, bag_name, contents):
+    bag_id = self.intern(bag_name)
+    old_children = {child_id for _, child_id in self.contents[bag_id]}
+    for child_id in old_children:
+      self.parents[child_id].discard(bag_id)
+    self.contents[bag_id] = [(count, self.intern(child)) for count, child in contents]
+    new_children = {child_id for _, child_id in self.contents[bag_id]}
+    for child_id in new_children:
+      self.parents[child_id].add(bag_id)
+    self.bags[bag_name] = contents
+
+    # A cached count implies the counts of all of its contents are cached, so the traversal can
+    # stop at any bag whose count is not cached
+    pending = [bag_id]
+    while pending:
+      current = pending.pop()
+      if current in self.counts:
+        del self.counts[current]
+        pending.extend(self.parents[current])
+
+    reparented = old_children ^ new_children
+    for query in [query for query, ancestors in self.ancestors.items()
+                  if query in reparented or not ancestors.isdisjoint(reparented)]:
+      del self.ancestors[query]
+
+  # Removes the rule for the given bag, leaving it as a bag which contains no other bags
+  def remove_rule(self, bag_name):
+    self.set_rule(bag_name, [])
+    del self.bags[bag_name]
+
+  # Counts the contents of the given bag, memoizing the count of every bag visited on the way
+  # An explicit stack is used so that deep rule chains do not exceed the recursion limit.
+  def count_ids(self, bag_id):
+    counts, stack = self.counts, [bag_id]
+    while stack:
+      current = stack[-1]
+      if current in counts:
+        stack.pop()
+        continue
+      pending = [child for _, child in self.contents[current] if child not in counts]
+      if pending:
+        stack.extend(pending)
+      else:
+        counts[current] = sum(n + n * counts[child] for n, child in self.contents[current])
+        stack.pop()
+    return counts[bag_id]
+
+  def ancestor_ids(self, bag_id):
+    if bag_id not in self.ancestors:
+      ancestors, pending = set(), [bag_id]
+      while pending:
+        for parent in self.parents[pending.pop()]:
+          if parent not in ancestors:
+            ancestors.add(parent)
+            pending.append(parent)
+      self.ancestors[bag_id] = frozenset(ancestors)
+    return self.ancestors[bag_id]
+
+  # Finds the unique bags which can (directly or indirectly) contain the given bag
+  def containers(self, bag_name):
+    return {self.names[bag_id] for bag_id in self.ancestor_ids(self.ids[bag_name])}
+
+  # Counts the total number of (sub-)bags contained within the given bag
+  def count_contents(self, bag_name):
+    return self.count_ids(self.ids[bag_name])
+
+  # Answers `containers` for each of the given bags
+  def batch_containers(self, bag_names):
+    return {bag_name: self.containers(bag_name) for bag_name in bag_names}
+
+  # Answers `count_contents` for many bags at once, sharing the memoized traversal between them
+  def batch_count_contents(self, bag_names):
+    return {bag_name: self.count_contents(bag_name) for bag_name in bag_names}
 
 def main():
   # Parse arguments
@@ -56,11 +142,11 @@ def main():
   parser.add_argument('bag', help='the bag name to solve for, e.g. "shiny gold"')
   args = parser.parse_args()
 
-  bags = parse_file(args.input)
+  bags = BagGraph(parse_file(args.input))
 
   # Solve problems
-  print("Solution to part 1:", len(get_top_level_bags(bags, args.bag)))
-  print("Solution to part 2:", count_contents(bags, args.bag))
+  print("Solution to part 1:", len(bags.containers(args.bag)))
+  print("Solution to part 2:", bags.count_contents(args.bag))
 
 if __name__ == '__main__':
   main()
\ No newline at end of file
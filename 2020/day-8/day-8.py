@@ -1,7 +1,10 @@
 #!/usr/bin/env python3
 
 import argparse
+import json
+import random
 import re
+from array import array
 
 """
 Part 1:
@@ -31,7 +34,7 @@ def parse_file(input_file_name):
 # Returns the resulting accumulator value, as well as whether or not the EOF was reached
 def run(program):
   accumulator, line_number, executed_line_numbers = 0, 0, []
-  while line_number not in executed_line_numbers and line_number < len(program):
+  while line_number not in executed_line_numbers and 0 <= line_number < len(program):
     executed_line_numbers.append(line_number)
     opcode, operand = program[line_number]
     if opcode == 'nop':
@@ -43,31 +46,162 @@ def run(program):
       line_number = line_number + operand
   return accumulator, line_number >= len(program)
 
-# Returns all possible programs where exactly one 'jmp' is changed to a 'nop', or vice versa
-def get_uncorrupted_candidates(program):
-  alternatives = []
+# Counters collected by `run_instrumented`, each held in a compact array indexed by line number:
+#   executions:   the number of times each instruction was executed
+#   jump_targets: the number of jumps taken to each line, where index `len(program)` is the EOF
+#   loop_entries: the number of times each line was entered along a backward (or self) jump
+# as well as the line whose repeated execution halted the program, and the line whose jump to before
+# the first line halted it (both None unless the program halted that way)
+class ExecutionProfile:
+  def __init__(self, size):
+    self.executions = array('I', bytes(4 * size))
+    self.jump_targets = array('I', bytes(4 * (size + 1)))
+    self.loop_entries = array('I', bytes(4 * size))
+    self.halted_at = None
+    self.jumped_out_at = None
+
+  def to_json(self):
+    def nonzero(counters): return {line: count for line, count in enumerate(counters) if count}
+    return json.dumps({
+      'executions': nonzero(self.executions),
+      'jump_targets': nonzero(self.jump_targets),
+      'loop_entries': nonzero(self.loop_entries),
+      'halted_at': self.halted_at,
+      'jumped_out_at': self.jumped_out_at
+    })
+
+# Equivalent to `run`, but also returns an `ExecutionProfile` of the run
+# This is kept separate from `run` so that uninstrumented runs pay nothing for the counters.
+def run_instrumented(program):
+  size = len(program)
+  profile = ExecutionProfile(size)
+  executions, jump_targets, loop_entries = \
+    profile.executions, profile.jump_targets, profile.loop_entries
+  accumulator, line_number = 0, 0
+  while 0 <= line_number < size and not executions[line_number]:
+    executions[line_number] = executions[line_number] + 1
+    opcode, operand = program[line_number]
+    if opcode == 'nop':
+      line_number = line_number + 1
+    elif opcode == 'acc':
+      accumulator = accumulator + operand
+      line_number = line_number + 1
+    elif opcode == 'jmp':
+      if line_number + operand < 0:
+        profile.jumped_out_at, line_number = line_number, line_number + operand
+        break
+      line_number = line_number + operand
+      jump_targets[min(line_number, size)] = jump_targets[min(line_number, size)] + 1
+      if operand <= 0: loop_entries[line_number] = loop_entries[line_number] + 1
+  if 0 <= line_number < size: profile.halted_at = line_number
+  return accumulator, line_number >= size, profile
+
+# Computes the accumulator value of the program once repaired by changing exactly one 'jmp' to a
+# 'nop', or vice versa, returning None if no such change makes the program terminate
+# The program is treated as a control-flow graph in which each instruction has one successor. A
+# reverse traversal from the EOF then marks every instruction from which the program terminates.
+# The repair is the first instruction on the original execution path whose changed successor is
+# marked, after which execution follows marked instructions (none of which can be the changed one)
+# to the EOF. Each instruction is visited a constant number of times, so this runs in linear time.
+# A jump to before the first line leaves the program without reaching the EOF, so never terminates.
+def repair(program):
+  size = len(program)
+
+  jump_sources = {}
   for line_number, (opcode, operand) in enumerate(program):
-    if opcode != 'acc':
-      alternatives.append([instruction if index != line_number else
-                          ('jmp' if opcode == 'nop' else 'nop', operand)
-                          for index, instruction in enumerate(program)])
-  return alternatives
+    if opcode == 'jmp' and line_number + operand >= 0:
+      jump_sources.setdefault(min(line_number + operand, size), []).append(line_number)
+
+  # Every instruction has exactly one successor, so each is reached exactly once when traversing
+  # backwards from the EOF, either by falling through from the next line or along a jump
+  terminates, pending = bytearray(size + 1), [size]
+  while pending:
+    line_number = pending.pop()
+    terminates[line_number] = 1
+    pending.extend(jump_sources.get(line_number, ()))
+    if line_number > 0 and program[line_number - 1][0] != 'jmp':
+      pending.append(line_number - 1)
+
+  accumulator, line_number, executed = 0, 0, bytearray(size)
+  while not terminates[line_number]:
+    if executed[line_number]: return None
+    executed[line_number] = 1
+    opcode, operand = program[line_number]
+    if opcode == 'acc':
+      accumulator, line_number = accumulator + operand, line_number + 1
+    elif opcode == 'nop':
+      if line_number + operand >= 0 and terminates[min(line_number + operand, size)]:
+        line_number = line_number + operand
+        break
+      line_number = line_number + 1
+    else:
+      if terminates[line_number + 1]:
+        line_number = line_number + 1
+        break
+      line_number = line_number + operand
+      if line_number < 0: return None
+
+  while line_number < size:
+    opcode, operand = program[line_number]
+    if opcode == 'acc': accumulator = accumulator + operand
+    line_number = line_number + operand if opcode == 'jmp' else line_number + 1
+  return accumulator
+
+# Checks `repair` against a brute force search over every changed program, on random programs which
+# include jumps past either end (skipping those which already terminate, and so need no repair), and
+# checks `run_instrumented` against `run` on the same programs
+def test_repair():
+  programs = [[('nop', -1), ('acc', -3), ('jmp', 0), ('acc', 5), ('acc', -5), ('nop', 7),
+               ('acc', 1), ('nop', 6)]]
+  generator = random.Random(8)
+  for _ in range(2000):
+    size = generator.randint(1, 12)
+    programs.append([(generator.choice(['nop', 'acc', 'jmp']), generator.randint(-size, size))
+                     for _ in range(size)])
+
+  for program in programs:
+    if run(program)[1]: continue
+    accumulators = set()
+    for line_number, (opcode, operand) in enumerate(program):
+      if opcode != 'acc':
+        changed = list(program)
+        changed[line_number] = ('jmp' if opcode == 'nop' else 'nop', operand)
+        accumulator, terminated = run(changed)
+        if terminated: accumulators.add(accumulator)
+    accumulator = repair(program)
+    assert accumulator in accumulators if accumulators else accumulator is None
+
+  # Instrumented runs agree with plain runs, including when a jump leaves before the first line
+  programs = programs + [[('jmp', -1), ('acc', 5)], [('jmp', -5)],
+                         [('nop', 0), ('jmp', -3), ('acc', 1)]]
+  for program in programs:
+    assert run_instrumented(program)[:2] == run(program)
+  profile = run_instrumented([('nop', 0), ('jmp', -3), ('acc', 1)])[2]
+  assert not any(profile.jump_targets) and not any(profile.loop_entries)
+  assert profile.halted_at is None and profile.jumped_out_at == 1
+
+  print("All tests passed.")
 
 def main():
   # Parse arguments
   parser = argparse.ArgumentParser()
   parser.add_argument('input', help='a text file containing the Advent of Code problem input')
+  parser.add_argument('--profile', help='a file to which to write an execution profile of part 1')
   args = parser.parse_args()
 
   program = parse_file(args.input)
 
-  # Solve problems
-  print("Solution to part 1:", run(program)[0])
+  test_repair()
 
-  # Run all potential uncorrupted candidate programs, and find the first run which reaches EOF
-  runs = map(run, get_uncorrupted_candidates(program))
-  terminating_run = next(run for run in runs if run[1])
-  print("Solution to part 2:", terminating_run[0])
+  # Solve problems
+  if args.profile is None:
+    print("Solution to part 1:", run(program)[0])
+  else:
+    accumulator, _, profile = run_instrumented(program)
+    with open(args.profile, 'w') as profile_file:
+      profile_file.write(profile.to_json())
+    print("Solution to part 1:", accumulator)
+  print("Solution to part 2:", repair(program))
 
 if __name__ == '__main__':
   main()
\ No newline at end of file
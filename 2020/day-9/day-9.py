@@ -1,7 +1,8 @@
 #!/usr/bin/env python3
 
 import argparse
-from itertools import combinations
+import sys
+from collections import Counter, deque
 
 """
 Part 1:
@@ -15,21 +16,65 @@ Return the sum of the smallest and largest number in this sub-list.
 Assumption: well-formed input
 """
 
+# Determines whether any two distinct entries of the window (a count of each value) sum to `value`
+def is_pair_sum(window, value):
+  for addend, count in window.items():
+    complement = value - addend
+    if complement != addend:
+      if complement in window: return True
+    elif count > 1: return True
+  return False
+
+# Reads values lazily, one line at a time
+def read_values(input_file):
+  for line in input_file:
+    if line.strip(): yield int(line)
+
+# Yields each value which is not the sum of two of its preceding values as soon as it arrives
+# The preceding values are kept in a rolling count of each value, which is updated in constant time
+# as the window slides and makes each validity check linear in the preamble length. Only the window
+# is held in memory, so `values` may be an unbounded stream.
+def monitor_invalid_values(values, preamble_length):
+  window, preceding_values = Counter(), deque()
+  for value in values:
+    if len(preceding_values) == preamble_length:
+      if not is_pair_sum(window, value): yield value
+      expired = preceding_values.popleft()
+      window[expired] = window[expired] - 1
+      if not window[expired]: del window[expired]
+    preceding_values.append(value)
+    window[value] = window[value] + 1
+
 def find_invalid_value(values, preamble_length):
-  for i, value in enumerate(values[preamble_length:]):
-    preceding_values = values[i:i+preamble_length]
-    preceding_pairs = combinations(preceding_values, 2)
-    if not any(map(lambda v : v == value, map(sum, preceding_pairs))):
-      return value
+  return next(monitor_invalid_values(values, preamble_length), None)
 
+# The values between the two pointers are held in a queue along with their running sum, so `values`
+# may be a stream and only the current sub-list is ever held in memory
 def find_contiguous_sum(values, target):
-  left_ptr, right_ptr = 0, 0
-  while True:
-    sublist = values[left_ptr:right_ptr]
-    sublist_sum = sum(sublist)
-    if   sublist_sum == target: return sublist
-    elif sublist_sum <  target: right_ptr = right_ptr + 1
-    elif sublist_sum >  target: left_ptr  = left_ptr  + 1
+  sublist, sublist_sum = deque(), 0
+  for value in values:
+    sublist.append(value)
+    sublist_sum = sublist_sum + value
+    while sublist_sum > target:
+      sublist_sum = sublist_sum - sublist.popleft()
+    if sublist_sum == target:
+      return list(sublist)
+
+# Reports invalid values from a file (or stdin, given '-') as they arrive
+# Part 2 requires a second pass over the values, so it is only solved when reading from a file.
+def monitor(input_file_name, preamble_length):
+  input_file = sys.stdin if input_file_name == '-' else open(input_file_name)
+  with input_file:
+    first_invalid_value = None
+    for invalid_value in monitor_invalid_values(read_values(input_file), preamble_length):
+      print("Invalid value:", invalid_value, flush=True)
+      if first_invalid_value is None: first_invalid_value = invalid_value
+
+  if first_invalid_value is not None and input_file_name != '-':
+    print("Solution to part 1:", first_invalid_value)
+    with open(input_file_name) as input_file:
+      contiguous_sublist = find_contiguous_sum(read_values(input_file), first_invalid_value)
+      print("Solution to part 2:", min(contiguous_sublist) + max(contiguous_sublist))
 
 def main():
   # Parse arguments
@@ -37,8 +82,14 @@ def main():
   parser.add_argument('input', help='a text file containing the Advent of Code problem input')
   parser.add_argument('preamble_length', metavar='preamble-length',
     help='the number of values to consider as the input preamble', type=int)
+  parser.add_argument('--stream', action='store_true',
+    help='report every invalid value as it is read, using memory bounded by the preamble')
   args = parser.parse_args()
 
+  if args.stream:
+    monitor(args.input, args.preamble_length)
+    return
+
   with open(args.input) as input_file:
     values = [int(value) for value in input_file.readlines()]
 
@@ -0,0 +1,89 @@
+import re
+
+"""
+A declarative rule engine for validating records, shared by the solutions which validate input.
+
+A ruleset is built from value expressions, which read from the record being validated:
+  field(*keys)               the value at `record[key_1][key_2]...`
+  as_int(value)              the value converted to an integer
+  count(value, sub)          the number of occurrences of `sub` in the value
+  char_at(value, position)   the character at the given 1-indexed position in the value
+  slice_of(value, start, stop)
+and rules, which check values:
+  present(*keys)             the record contains the given field
+  in_range(value, min, max)  min <= value <= max
+  one_of(value, options)     the value is one of a fixed set of options
+  matches(value, pattern)    the value matches a regular expression
+  equals(a, b)
+  all_of(*rules), any_of(*rules), exactly_one(*rules)
+Any argument may be either an expression or a constant.
+
+A ruleset is compiled once, by `compile_rules`, into a single Python function. Each rule becomes
+part of one boolean expression in that function's source, so that the validation of a record costs
+one function call however many rules there are, with no interpretation of the ruleset at run time.
+"""
+
+# An expression is represented by a function which, given the compilation environment (into which
+# any non-literal constants are placed), returns the Python source of the expression
+def constant(env, value):
+  if value is None or isinstance(value, (bool, int, str)): return repr(value)
+  name = '_c' + str(len(env))
+  env[name] = value
+  return name
+
+def source(env, expression):
+  return expression(env) if callable(expression) else constant(env, expression)
+
+def field(*keys):
+  return lambda env: 'record' + ''.join('[' + constant(env, key) + ']' for key in keys)
+
+def as_int(value):
+  return lambda env: 'int(' + source(env, value) + ')'
+
+def count(value, sub):
+  return lambda env: source(env, value) + '.count(' + source(env, sub) + ')'
+
+def char_at(value, position):
+  return lambda env: source(env, value) + '[' + source(env, position) + ' - 1]'
+
+def slice_of(value, start, stop):
+  return lambda env: source(env, value) + '[' + source(env, start) + ':' + source(env, stop) + ']'
+
+def present(*keys):
+  def compile_present(env):
+    container = field(*keys[:-1])(env)
+    return '(' + constant(env, keys[-1]) + ' in ' + container + ')'
+  return compile_present
+
+def in_range(value, minimum, maximum):
+  return lambda env: ('(' + source(env, minimum) + ' <= ' + source(env, value) + ' <= ' +
+                      source(env, maximum) + ')')
+
+def one_of(value, options):
+  return lambda env: '(' + source(env, value) + ' in ' + constant(env, frozenset(options)) + ')'
+
+def matches(value, pattern):
+  return lambda env: ('(' + constant(env, re.compile(pattern).match) + '(' + source(env, value) +
+                      ') is not None)')
+
+def equals(a, b):
+  return lambda env: '(' + source(env, a) + ' == ' + source(env, b) + ')'
+
+def all_of(*rules):
+  return lambda env: '(' + ' and '.join(source(env, rule) for rule in rules) + ')'
+
+def any_of(*rules):
+  return lambda env: '(' + ' or '.join(source(env, rule) for rule in rules) + ')'
+
+def exactly_one(*rules):
+  return lambda env: '(' + ' + '.join(source(env, rule) for rule in rules) + ' == 1)'
+
+# Compiles a ruleset into a function which takes a record and returns whether it is valid
+def compile_rules(ruleset, name='validate'):
+  env = {}
+  body = source(env, ruleset)
+  namespace = dict(env)
+  exec('def ' + name + '(record):\n  return ' + body + '\n', namespace)
+  validate = namespace[name]
+  validate.source = body
+  return validate